@@ -5,23 +5,180 @@ This script combines track points from multiple GPX files, sorted by timestamp.
 """
 
 import argparse
+import fnmatch
+import glob
+import heapq
+import os
+import re
 import sys
 from pathlib import Path
-from datetime import datetime
-from xml.etree import ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, chain, islice, repeat
+from operator import itemgetter
 from typing import List, Tuple
+from xml.parsers import expat
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    # lxml parses, searches and serializes in C; use it when it is installed
+    from lxml import etree as ET
+
+    HAVE_LXML = True
+except ImportError:
+    from xml.etree import ElementTree as ET
+
+    HAVE_LXML = False
+
+if sys.version_info >= (3, 11):
+    # fromisoformat understands the trailing "Z" used by GPX timestamps
+    _parse_iso = datetime.fromisoformat
+else:
+
+    def _parse_iso(text: str) -> datetime:
+        """Parse an ISO 8601 timestamp, accepting a trailing "Z" for UTC."""
+        if text.endswith("Z"):
+            return datetime.fromisoformat(text[:-1] + "+00:00")
+        return datetime.fromisoformat(text)
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _sort_key(text: str) -> int:
+    """
+    Convert an ISO 8601 timestamp into a sort key.
+
+    The key is the number of microseconds since the Unix epoch in UTC.
+    Timestamps without a UTC offset are taken to be UTC, as GPX requires.
+
+    Raises:
+        ValueError: If the timestamp is not valid ISO 8601
+    """
+    timestamp = _parse_iso(text)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+# Devices that log several points per second repeat the same time text
+_cached_sort_key = lru_cache(maxsize=8192)(_sort_key)
+
+
+_XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+# Characters escaped in attribute values, as ElementTree does
+_ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
+
+
+@lru_cache(maxsize=None)
+def _split_name(name: str) -> Tuple[str, str]:
+    """Split a Clark-notation name into namespace URI and local name."""
+    if name[:1] == "{":
+        uri, local = name[1:].split("}", 1)
+        return uri, local
+    return "", name
+
+
+def _new_prefix(uri: str, scope: dict, prefixes: dict) -> str:
+    """Pick a prefix for `uri` that is not in use in `scope`."""
+    prefix = prefixes.get(uri)
+    taken = set(scope.values())
+    if prefix is None or prefix in taken:
+        number = 0
+        while f"ns{number}" in taken or f"ns{number}" in prefixes.values():
+            number += 1
+        prefix = f"ns{number}"
+    return prefix
+
+
+class _ExpatUnsupported(Exception):
+    """Raised by the expat reader for a file it leaves to ElementTree."""
 
 
 class GPXMerger:
     """Merge multiple GPX files chronologically."""
 
     GPX_NAMESPACE = "http://www.topografix.com/GPX/1/1"
-    ET.register_namespace("", GPX_NAMESPACE)
 
-    def __init__(self):
-        """Initialize the GPX Merger."""
-        self.track_points = []
+    # Clark-notation tag names ("{namespace}tag") for direct tag matching
+    _METADATA = "{%s}metadata" % GPX_NAMESPACE
+    _NAME = "{%s}name" % GPX_NAMESPACE
+    _DESC = "{%s}desc" % GPX_NAMESPACE
+    _TIME = "{%s}time" % GPX_NAMESPACE
+    _TRKSEG = "{%s}trkseg" % GPX_NAMESPACE
+    _TRKPT = "{%s}trkpt" % GPX_NAMESPACE
+    _WPT = "{%s}wpt" % GPX_NAMESPACE
+
+    # Declaration repeated on every serialized point; the output root has it
+    _DEFAULT_NS_DECL = b' xmlns="%s"' % GPX_NAMESPACE.encode()
+    # Keeps unprefixed elements out of the output's default GPX namespace
+    _NO_DEFAULT_NS_DECL = b' xmlns=""'
+    # The output document around the track points; only the metadata and the
+    # namespace prefixes declared by the input files vary
+    _HEADER_TEMPLATE = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<gpx xmlns="{GPX_NAMESPACE}"{{namespaces}} version="1.1" '
+        'creator="GPX Merger Script">'
+        "<metadata><name>{name}</name><desc>{desc}</desc><time>{time}</time>"
+        "</metadata><trk><name>Merged Track</name><trkseg>\n"
+    )
+    _FOOTER = b"</trkseg></trk></gpx>\n"
+    # lat/lon attributes in the start tag of a point, in either quote style
+    _LAT_ATTR = re.compile(rb"""<[^>]*?\slat\s*=\s*(["'])(.*?)\1""")
+    _LON_ATTR = re.compile(rb"""<[^>]*?\slon\s*=\s*(["'])(.*?)\1""")
+    # Tag names as reported by expat with namespace_separator=" "
+    _EXPAT_TRKPT = GPX_NAMESPACE + " trkpt"
+    _EXPAT_WPT = GPX_NAMESPACE + " wpt"
+    _EXPAT_TIME = GPX_NAMESPACE + " time"
+    _EXPAT_METADATA = GPX_NAMESPACE + " metadata"
+    _EXPAT_FIELDS = {GPX_NAMESPACE + " name": "name", GPX_NAMESPACE + " desc": "desc"}
+    # Encodings whose bytes can be copied into the UTF-8 output unchanged
+    _UTF8_ENCODINGS = {"utf-8", "utf8", "us-ascii", "ascii"}
+    # The start tag's name, after which namespace declarations are inserted
+    _START_TAG_NAME = re.compile(rb"<[^\s/>]+")
+    # Total input size from which parse_gpx_files uses worker processes
+    _PARALLEL_MIN_BYTES = 2 << 20
+
+    def __init__(self, use_expat: bool = False):
+        """
+        Initialize the GPX Merger.
+
+        Args:
+            use_expat: Read files with the expat-based reader, which copies
+                the points' XML from the file instead of building elements
+                (see _read_gpx_file_expat)
+        """
+        self.use_expat = use_expat
+        # Points are kept as parallel lists: sort key and source file
+        self._times = array("q")
+        self._srcs: List[str] = []
+        # The XML of all points back to back; point i spans
+        # _data[_offsets[i]:_offsets[i + 1]]
+        self._data = bytearray()
+        self._offsets = array("Q", [0])
+        # Indices into the lists above in merge order (None: as parsed)
+        self._order = None
         self.metadata = {}
+        # Namespace prefixes declared on the output root, as prefix -> URI
+        self._namespaces = {}
+
+    @property
+    def track_points(self) -> List[Tuple[int, bytes, str]]:
+        """(sort key, XML bytes, source file) for every point, in merge order."""
+        data, offsets = self._data, self._offsets
+        return [
+            (self._times[i], bytes(data[offsets[i] : offsets[i + 1]]), self._srcs[i])
+            for i in self._indices()
+        ]
+
+    def _indices(self):
+        """Return the point indices in merge order."""
+        if self._order is None:
+            return range(len(self._times))
+        return self._order
 
     def parse_gpx_file(self, file_path: str) -> None:
         """
@@ -30,6 +187,105 @@ class GPXMerger:
         Args:
             file_path: Path to the GPX file
 
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ET.ParseError: If the file is not valid XML
+        """
+        self._add_file(file_path, *self._read_gpx_file(file_path, self.use_expat))
+
+    def parse_gpx_files(self, file_paths: List[str], max_workers=None) -> None:
+        """
+        Parse several GPX files in parallel worker processes.
+
+        Points are added in the order of file_paths, exactly as if
+        parse_gpx_file had been called for each file in turn. With a single
+        CPU, or inputs smaller than _PARALLEL_MIN_BYTES in total, the files
+        are parsed in this process, as starting workers would not pay off.
+
+        Args:
+            file_paths: Paths to the GPX files
+            max_workers: Number of worker processes (default: one per CPU)
+
+        Raises:
+            FileNotFoundError: If a file doesn't exist
+            ET.ParseError: If a file is not valid XML
+        """
+        workers = max_workers or os.cpu_count() or 1
+        total_size = sum(os.path.getsize(p) for p in file_paths if os.path.isfile(p))
+        if (
+            len(file_paths) < 2
+            or workers < 2
+            or total_size < self._PARALLEL_MIN_BYTES
+        ):
+            for file_path in file_paths:
+                self.parse_gpx_file(file_path)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_read_gpx_file_in_worker, file_path, self.use_expat)
+                for file_path in file_paths
+            ]
+            try:
+                for file_path, future in zip(file_paths, futures):
+                    parsed, error = future.result()
+                    if error is not None:
+                        raise _make_parse_error(*error)
+                    self._add_file(file_path, *parsed)
+            except BaseException:
+                # Don't wait for the files still queued; shutdown's
+                # cancel_futures would do this but needs Python 3.9
+                for future in futures:
+                    future.cancel()
+                raise
+
+    @classmethod
+    def _read_gpx_file(
+        cls, file_path: str, use_expat: bool = False
+    ) -> Tuple[dict, dict, array, List[bytes]]:
+        """
+        Parse a GPX file without touching any merger state.
+
+        Args:
+            file_path: Path to the GPX file
+            use_expat: Use the expat-based reader where it supports the file
+
+        Returns:
+            The file's metadata, the namespace prefixes declared on its root
+            element, and the sort key and XML of every point with a valid
+            timestamp. The points use those prefixes without declaring them.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ET.ParseError: If the file is not valid XML
+        """
+        parsed = cls._read_gpx_file_expat(file_path) if use_expat else None
+        if parsed is not None:
+            metadata, namespaces, raw_times, points = parsed
+        else:
+            metadata = {}
+            namespaces = {}
+            raw_times = []
+            points = []
+            for _, text, point in cls._iter_gpx_file(file_path, metadata, namespaces):
+                raw_times.append(text)
+                points.append(point)
+
+        keys, points = cls._convert_timestamps(raw_times, points, file_path)
+        return metadata, namespaces, keys, points
+
+    @classmethod
+    def _iter_gpx_file(cls, file_path: str, metadata: dict, namespaces: dict):
+        """
+        Stream the timestamped points of a GPX file.
+
+        Yields (tag, time text, point XML) for every trkpt and wpt with a
+        time element, in document order. The file's metadata is stored in
+        `metadata` as soon as it has been read, and the namespace prefixes
+        declared on its root element in `namespaces` (prefix -> URI) before
+        the first point. Points use those prefixes without declaring them;
+        the output root is to declare them once instead.
+
         Raises:
             FileNotFoundError: If the file doesn't exist
             ET.ParseError: If the file is not valid XML
@@ -38,75 +294,558 @@ class GPXMerger:
         if not path.exists():
             raise FileNotFoundError(f"GPX file not found: {file_path}")
 
+        trkpt_tag = cls._TRKPT
+        wpt_tag = cls._WPT
+        time_tag = cls._TIME
+        trkseg_tag = cls._TRKSEG
+        metadata_tag = cls._METADATA
+
+        # Opened here so that the file is also closed when a caller stops
+        # reading before the end, e.g. when a streaming merge fails
+        source = open(file_path, "rb")
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
+            # Stream the file instead of building the whole tree up front
+            if HAVE_LXML:
+                context = ET.iterparse(source, events=("end",))
+                parents = None
+            else:
+                # The stdlib has no getparent(), so track the open elements,
+                # and no prefixes on its elements, so collect the source's
+                context = ET.iterparse(
+                    source, events=("start", "end", "start-ns")
+                )
+                parents = []
+            prefixes = {}
+            # Prefixes in effect on the root element, as URI -> prefix
+            scope = {}
+            strip = None
+            for event, elem in context:
+                if event == "start":
+                    parents.append(elem)
+                    continue
+                if event == "start-ns":
+                    prefix, uri = elem
+                    if prefix:
+                        prefixes.setdefault(uri, prefix)
+                        if not parents:
+                            namespaces[prefix] = uri
+                            scope.setdefault(uri, prefix)
+                    continue
+                if parents is not None:
+                    parents.pop()
 
-            # Extract metadata from the first file
-            if not self.metadata:
-                self._extract_metadata(root)
+                tag = elem.tag
+                if tag == trkpt_tag or tag == wpt_tag:
+                    time_elem = elem.find(time_tag)
+                    if time_elem is not None and time_elem.text:
+                        if parents is not None:
+                            point = cls._write_point(elem, scope, prefixes)
+                        else:
+                            if strip is None:
+                                strip = cls._root_declarations(elem, namespaces)
+                            point = cls._serialize_point(elem, strip)
+                        yield tag, time_elem.text, point
+                    # Detach the finished point and the siblings before it,
+                    # so a long segment doesn't keep one element per point
+                    elem.clear()
+                    if parents is None:
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
+                    elif parents:
+                        parents[-1].remove(elem)
+                elif tag == trkseg_tag:
+                    elem.clear()
+                elif tag == metadata_tag:
+                    metadata.update(cls._extract_metadata(elem))
 
-            # Extract all track points (trkpt)
-            self._extract_track_points(root, file_path)
+            context.root.clear()
+            del context
 
         except ET.ParseError as e:
-            raise ET.ParseError(f"Invalid GPX file '{file_path}': {e}")
-
-    def _extract_metadata(self, root) -> None:
-        """Extract metadata from GPX root element."""
-        # Define namespace map for finding elements
-        ns = {"gpx": self.GPX_NAMESPACE}
-
-        metadata = root.find("gpx:metadata", ns)
-        if metadata is not None:
-            name = metadata.find("gpx:name", ns)
-            if name is not None:
-                self.metadata["name"] = name.text
-            desc = metadata.find("gpx:desc", ns)
-            if desc is not None:
-                self.metadata["desc"] = desc.text
-
-    def _extract_track_points(self, root, file_path: str) -> None:
-        """Extract all track points from a GPX file."""
-        ns = {"gpx": self.GPX_NAMESPACE}
-
-        # Find all track points in tracks
-        for trkpt in root.findall(".//gpx:trkpt", ns):
-            time_elem = trkpt.find("gpx:time", ns)
-            if time_elem is not None and time_elem.text:
-                try:
-                    # Parse ISO 8601 timestamp
-                    timestamp = datetime.fromisoformat(
-                        time_elem.text.replace("Z", "+00:00")
-                    )
-                    # Store both the element and its timestamp
-                    self.track_points.append((timestamp, trkpt, file_path))
-                except ValueError:
-                    print(
-                        f"Warning: Could not parse timestamp '{time_elem.text}' "
-                        f"from {file_path}",
-                        file=sys.stderr,
-                    )
+            raise _make_parse_error(
+                f"Invalid GPX file '{file_path}': {e.msg}", e.code, *e.position
+            )
+        finally:
+            source.close()
 
-        # Also find waypoints (wpt)
-        for wpt in root.findall(".//gpx:wpt", ns):
-            time_elem = wpt.find("gpx:time", ns)
-            if time_elem is not None and time_elem.text:
-                try:
-                    timestamp = datetime.fromisoformat(
-                        time_elem.text.replace("Z", "+00:00")
-                    )
-                    self.track_points.append((timestamp, wpt, file_path))
-                except ValueError:
-                    print(
-                        f"Warning: Could not parse timestamp '{time_elem.text}' "
-                        f"from {file_path}",
-                        file=sys.stderr,
+    @classmethod
+    def _read_gpx_file_expat(cls, file_path: str):
+        """
+        Read the timestamped points of a GPX file with expat callbacks.
+
+        No elements are built: the handlers only note where each trkpt and
+        wpt starts and ends and collect the text of its time element, and
+        the point's XML is copied from the file as is. Prefixes declared on
+        the root element are left for the output root to declare, those
+        the point takes from its other ancestors are declared on the copy.
+
+        Returns:
+            The file's metadata, the namespace prefixes declared on its root
+            element, and the time text and XML of every point
+            with a time element; None if the file is not UTF-8 or has a
+            DTD, which are left to _iter_gpx_file
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ET.ParseError: If the file is not valid XML
+        """
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"GPX file not found: {file_path}")
+
+        data = path.read_bytes()
+        if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+            # UTF-16
+            return None
+
+        trkpt_tag = cls._EXPAT_TRKPT
+        wpt_tag = cls._EXPAT_WPT
+        time_tag = cls._EXPAT_TIME
+        metadata_tag = cls._EXPAT_METADATA
+        fields = cls._EXPAT_FIELDS
+
+        metadata = {}
+        namespaces = {}
+        raw_times = []
+        points = []
+        # Namespace declarations made on each open element, outermost first
+        scopes = []
+        pending = {}
+        depth = 0
+        # Depth of the open point or metadata element, 0 if there is none
+        point_depth = 0
+        point_start = 0
+        point_time = None
+        metadata_depth = 0
+        # Character data of the time or metadata field being read
+        text = None
+        text_depth = 0
+        field = None
+
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+
+        def xml_decl(version, encoding, standalone):
+            if encoding and encoding.lower() not in cls._UTF8_ENCODINGS:
+                raise _ExpatUnsupported
+
+        def doctype(*args):
+            # The DTD may define entities, whose references the copy would keep
+            raise _ExpatUnsupported
+
+        def start_namespace(prefix, uri):
+            pending[prefix] = uri
+
+        def start_element(name, attrs):
+            nonlocal pending, depth, point_depth, point_start, point_time
+            nonlocal metadata_depth, text, text_depth, field
+            scopes.append(pending)
+            if pending:
+                if not depth:
+                    for prefix, uri in pending.items():
+                        if prefix is not None:
+                            namespaces[prefix] = uri
+                pending = {}
+            depth += 1
+            if point_depth:
+                # Only the point's first time element counts
+                if depth == point_depth + 1 and name == time_tag and point_time is None:
+                    text, text_depth, field = [], depth, None
+            elif name == trkpt_tag or name == wpt_tag:
+                point_depth = depth
+                point_start = parser.CurrentByteIndex
+                point_time = None
+            elif metadata_depth:
+                if depth == metadata_depth + 1 and name in fields:
+                    text, text_depth, field = [], depth, fields[name]
+            elif name == metadata_tag:
+                metadata_depth = depth
+
+        def end_element(name):
+            nonlocal depth, point_depth, point_time, metadata_depth, text, text_depth
+            if depth == text_depth:
+                value = "".join(text)
+                if field is None:
+                    point_time = value
+                else:
+                    metadata[field] = value or None
+                text = None
+                text_depth = 0
+            elif depth == point_depth:
+                if point_time:
+                    # The end tag starts at the current index
+                    end = data.index(b">", parser.CurrentByteIndex) + 1
+                    raw_times.append(point_time)
+                    points.append(declare_namespaces(data[point_start:end]) + b"\n")
+                point_depth = 0
+            elif depth == metadata_depth:
+                metadata_depth = 0
+            scopes.pop()
+            depth -= 1
+
+        def character_data(data):
+            if text is not None:
+                text.append(data)
+
+        def declare_namespaces(point: bytes) -> bytes:
+            """Declare the namespaces the point inherits on its start tag."""
+            own = scopes[point_depth - 1]
+            # The root's prefixes are declared on the output root
+            inherited = {}
+            for scope in islice(scopes, 1, point_depth - 1):
+                if scope:
+                    inherited.update(scope)
+            for prefix in own:
+                inherited.pop(prefix, None)
+
+            # The output root makes GPX the default namespace
+            if None not in own:
+                default = scopes[0].get(None, "")
+                default = inherited.pop(None, default)
+                if default != cls.GPX_NAMESPACE:
+                    inherited[None] = default
+            return cls._add_declarations(point, inherited)
+
+        parser.XmlDeclHandler = xml_decl
+        parser.StartDoctypeDeclHandler = doctype
+        parser.StartNamespaceDeclHandler = start_namespace
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+
+        try:
+            parser.Parse(data, True)
+        except _ExpatUnsupported:
+            return None
+        except expat.ExpatError as e:
+            raise _make_parse_error(
+                f"Invalid GPX file '{file_path}': {e}", e.code, e.lineno, e.offset
+            )
+
+        return metadata, namespaces, raw_times, points
+
+    @classmethod
+    def _add_declarations(cls, point: bytes, namespaces: dict) -> bytes:
+        """
+        Declare namespaces on the start tag of a serialized point.
+
+        `namespaces` maps prefixes to URIs, with None for the default
+        namespace; prefixes that the point doesn't use are left out.
+        """
+        declarations = []
+        for prefix, uri in namespaces.items():
+            if prefix is None:
+                declarations.append(" xmlns=" + quoteattr(uri))
+            elif prefix.encode() + b":" in point:
+                declarations.append(f" xmlns:{prefix}={quoteattr(uri)}")
+        if not declarations:
+            return point
+
+        name_end = cls._START_TAG_NAME.match(point).end()
+        return (
+            point[:name_end]
+            + "".join(declarations).encode("utf-8")
+            + point[name_end:]
+        )
+
+    @classmethod
+    def _stream_gpx_file(
+        cls, file_path: str, metadata: dict, namespaces: dict, waypoints: list
+    ):
+        """
+        Stream the track points of a GPX file that is in chronological order.
+
+        Yields (sort key, point XML) for every track point. Waypoints, which
+        GPX places before the tracks, are appended to `waypoints` instead.
+        `metadata` and `namespaces` are filled as by _iter_gpx_file.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ET.ParseError: If the file is not valid XML
+            ValueError: If the points are not in chronological order
+        """
+        wpt_tag = cls._WPT
+        last_key = None
+        for tag, text, point in cls._iter_gpx_file(file_path, metadata, namespaces):
+            try:
+                key = _sort_key(text)
+            except ValueError:
+                print(
+                    f"Warning: Could not parse timestamp '{text}' "
+                    f"from {file_path}",
+                    file=sys.stderr,
+                )
+                continue
+
+            if tag == wpt_tag:
+                if last_key is not None:
+                    raise ValueError(
+                        f"Waypoints in '{file_path}' follow its track points"
                     )
+                waypoints.append((key, point))
+                continue
+            if last_key is not None and key < last_key:
+                raise ValueError(
+                    f"Track points in '{file_path}' are not in chronological order"
+                )
+            last_key = key
+            yield key, point
+
+    @classmethod
+    def _extract_metadata(cls, metadata) -> dict:
+        """Extract metadata from a GPX metadata element."""
+        result = {}
+        name = metadata.find(cls._NAME)
+        if name is not None:
+            result["name"] = name.text
+        desc = metadata.find(cls._DESC)
+        if desc is not None:
+            result["desc"] = desc.text
+        return result
+
+    @classmethod
+    def _root_declarations(cls, point, namespaces: dict) -> List[bytes]:
+        """
+        Read the namespaces declared on the root of an lxml point's tree.
+
+        The prefixes are stored in `namespaces`. Returns the declarations
+        lxml repeats on a serialized point that the output root makes
+        redundant; if the source has no default namespace, an undeclaration
+        is returned in its place for unprefixed elements in the point.
+        """
+        root_nsmap = point.getroottree().getroot().nsmap
+        declarations = []
+        for prefix, uri in root_nsmap.items():
+            if prefix is not None:
+                namespaces[prefix] = uri
+                declarations.append(
+                    f" xmlns:{prefix}={quoteattr(uri)}".encode("utf-8")
+                )
+        default = root_nsmap.get(None)
+        if default is None:
+            declarations.append(cls._NO_DEFAULT_NS_DECL)
+        elif default == cls.GPX_NAMESPACE:
+            declarations.append(cls._DEFAULT_NS_DECL)
+        return declarations
+
+    @classmethod
+    def _serialize_point(cls, point, strip: List[bytes]) -> bytes:
+        """
+        Serialize an lxml point for the output's track segment, one per line.
 
-    def sort_by_timestamp(self) -> None:
-        """Sort all track points chronologically by timestamp."""
-        self.track_points.sort(key=lambda x: x[0])
+        `strip` lists the declarations to leave out of the start tag, from
+        _root_declarations; an undeclared default namespace is added instead.
+        """
+        data = ET.tostring(point, encoding="utf-8")
+        tag_end = data.index(b">")
+        start_tag = data[:tag_end]
+        for declaration in strip:
+            if declaration != cls._NO_DEFAULT_NS_DECL:
+                start_tag = start_tag.replace(declaration, b"", 1)
+            elif b' xmlns="' not in start_tag:
+                name_end = cls._START_TAG_NAME.match(start_tag).end()
+                start_tag = start_tag[:name_end] + declaration + start_tag[name_end:]
+        return start_tag + data[tag_end:].rstrip() + b"\n"
+
+    @classmethod
+    def _write_point(cls, point, scope: dict, prefixes: dict) -> bytes:
+        """
+        Serialize a stdlib point for the output's track segment, one per line.
+
+        `scope` maps the URIs of the prefixes declared on the output root to
+        them, and `prefixes` the URIs of any other prefixes in the source.
+        """
+        # ET.tostring sets up a writer and scans the element's namespaces on
+        # every call, which costs more than writing the point itself
+        parts = []
+        cls._write_element(parts.append, point, cls.GPX_NAMESPACE, scope, prefixes)
+        parts.append("\n")
+        return "".join(parts).encode("utf-8")
+
+    @classmethod
+    def _write_element(
+        cls, append, elem, default: str, scope: dict, prefixes: dict
+    ) -> None:
+        """
+        Write an ElementTree element, without its tail, as XML to `append`.
+
+        `default` is the default namespace in effect and `scope` maps the
+        URIs that have a prefix in effect to it. Other namespaces the element
+        uses are declared on it, with the source's prefix where possible.
+        """
+        uri, name = _split_name(elem.tag)
+        declarations = ""
+        if uri != default:
+            if uri in scope:
+                name = f"{scope[uri]}:{name}"
+            elif uri:
+                prefix = _new_prefix(uri, scope, prefixes)
+                scope = {**scope, uri: prefix}
+                declarations = f" xmlns:{prefix}={quoteattr(uri)}"
+                name = f"{prefix}:{name}"
+            else:
+                # An element in no namespace within the GPX default one
+                default = ""
+                declarations = ' xmlns=""'
+
+        attributes = []
+        for key, value in elem.attrib.items():
+            if key[:1] == "{":
+                attr_uri, key = _split_name(key)
+                if attr_uri == _XML_NAMESPACE:
+                    prefix = "xml"
+                elif attr_uri in scope:
+                    prefix = scope[attr_uri]
+                else:
+                    prefix = _new_prefix(attr_uri, scope, prefixes)
+                    scope = {**scope, attr_uri: prefix}
+                    declarations += f" xmlns:{prefix}={quoteattr(attr_uri)}"
+                key = f"{prefix}:{key}"
+            attributes.append(f' {key}="{escape(value, _ATTRIBUTE_ENTITIES)}"')
+
+        append(f"<{name}{declarations}{''.join(attributes)}")
+        text = elem.text
+        if not text and not len(elem):
+            append(" />")
+            return
+        append(">")
+        if text:
+            append(escape(text))
+        for child in elem:
+            if isinstance(child.tag, str):
+                cls._write_element(append, child, default, scope, prefixes)
+            if child.tail:
+                append(escape(child.tail))
+        append(f"</{name}>")
+
+    @staticmethod
+    def _convert_timestamps(
+        raw_times: list, points: list, file_path: str
+    ) -> Tuple[array, list]:
+        """Convert the timestamps of one file to sort keys in a batch."""
+        # The cache only pays off when timestamps repeat; for unique ones its
+        # bookkeeping costs more than parsing, so check a sample first
+        sample = raw_times[:256]
+        if len(set(sample)) * 4 <= len(sample) * 3:
+            sort_key = _cached_sort_key
+        else:
+            sort_key = _sort_key
+
+        try:
+            return array("q", map(sort_key, raw_times)), points
+        except ValueError:
+            pass
+
+        # Convert point by point to report and skip the bad timestamps
+        keys = array("q")
+        valid_points = []
+        for text, point in zip(raw_times, points):
+            try:
+                keys.append(sort_key(text))
+                valid_points.append(point)
+            except ValueError:
+                print(
+                    f"Warning: Could not parse timestamp '{text}' "
+                    f"from {file_path}",
+                    file=sys.stderr,
+                )
+        return keys, valid_points
+
+    def _add_file(
+        self,
+        file_path: str,
+        metadata: dict,
+        namespaces: dict,
+        keys: array,
+        points: List[bytes],
+    ) -> None:
+        """Store the points of one parsed file."""
+        # Metadata comes from the first file that has any
+        if not self.metadata:
+            self.metadata.update(metadata)
+
+        conflicts = self._merge_namespaces(namespaces)
+        if conflicts:
+            points = [self._add_declarations(point, conflicts) for point in points]
+
+        self._times.extend(keys)
+        self._srcs.extend(repeat(file_path, len(keys)))
+        # End offsets of the new points, continuing from the current data
+        # size; accumulate's initial argument would do this but needs 3.8
+        base = len(self._data)
+        self._offsets.extend(base + end for end in accumulate(map(len, points)))
+        self._data += b"".join(points)
+        self._order = None
+
+    def _merge_namespaces(self, namespaces: dict) -> dict:
+        """
+        Add a file's namespace prefixes to those of the output root.
+
+        Returns the prefixes the file binds to a different URI than an
+        earlier file did; its points have to declare those themselves.
+        """
+        conflicts = {}
+        for prefix, uri in namespaces.items():
+            if self._namespaces.setdefault(prefix, uri) != uri:
+                conflicts[prefix] = uri
+        return conflicts
+
+    def sort_by_timestamp(self, dedup: bool = False) -> int:
+        """
+        Sort all track points chronologically by timestamp.
+
+        Args:
+            dedup: Drop points whose timestamp, latitude and longitude all
+                match an earlier point, e.g. when merging several recordings
+                of the same ride
+
+        Returns:
+            The number of duplicate points dropped
+        """
+        # Stable, so points with equal timestamps keep their parse order
+        order = sorted(range(len(self._times)), key=self._times.__getitem__)
+        removed = 0
+        if dedup:
+            kept = self._drop_duplicates(order)
+            removed = len(order) - len(kept)
+            order = kept
+        self._order = order
+        return removed
+
+    def _drop_duplicates(self, order: List[int]) -> List[int]:
+        """Keep the first of each run of points with equal time and position."""
+        times, data, offsets = self._times, memoryview(self._data), self._offsets
+        points = ((times[i], data[offsets[i] : offsets[i + 1]], i) for i in order)
+        return [i for _, _, i in self._unique_points(points)]
+
+    @classmethod
+    def _unique_points(cls, points):
+        """
+        Drop points whose time and position match an earlier point.
+
+        `points` yields (sort key, point XML, ...) tuples in chronological
+        order; the first tuple of each duplicate group is passed through.
+        """
+        seen = set()
+        last_time = None
+        for item in points:
+            time, point = item[0], item[1]
+            # Sorted, so duplicates can only occur among equal timestamps
+            if time != last_time:
+                last_time = time
+                seen.clear()
+            lat = cls._LAT_ATTR.match(point)
+            lon = cls._LON_ATTR.match(point)
+            try:
+                # Compare numbers, so that e.g. "11.0" and "11.00" match
+                position = (float(lat.group(2)), float(lon.group(2)))
+            except (AttributeError, ValueError):
+                # Without a readable position a point is never a duplicate
+                yield item
+                continue
+            if position not in seen:
+                seen.add(position)
+                yield item
 
     def merge_to_file(self, output_path: str) -> None:
         """
@@ -115,53 +854,206 @@ class GPXMerger:
         Args:
             output_path: Path where the merged GPX file will be saved
         """
-        if not self.track_points:
+        if not self._times:
             print("Error: No track points found to merge.", file=sys.stderr)
             return
 
-        # Create a new GPX structure
-        gpx = ET.Element("gpx")
-        gpx.set("version", "1.1")
-        gpx.set("creator", "GPX Merger Script")
-        gpx.set("xmlns", self.GPX_NAMESPACE)
-
-        # Add metadata
-        metadata = ET.SubElement(gpx, "metadata")
-        name = ET.SubElement(metadata, "name")
-        name.text = self.metadata.get("name", "Merged GPX Track")
-        desc = ET.SubElement(metadata, "desc")
-        desc.text = self.metadata.get("desc", "Merged from multiple GPX files")
-        time = ET.SubElement(metadata, "time")
-        time.text = datetime.utcnow().isoformat() + "Z"
-
-        # Create a single track with merged points
-        trk = ET.SubElement(gpx, "trk")
-        trk_name = ET.SubElement(trk, "name")
-        trk_name.text = "Merged Track"
-
-        trk_seg = ET.SubElement(trk, "trkseg")
-
-        # Add all track points in chronological order
-        for timestamp, point_elem, source_file in self.track_points:
-            # Clone the element
-            new_point = self._clone_element(point_elem)
-            trk_seg.append(new_point)
-
-        # Write to file
-        tree = ET.ElementTree(gpx)
-        tree.write(output_path, encoding="utf-8", xml_declaration=True)
+        # Write the points in chronological order
+        data, offsets = memoryview(self._data), self._offsets
+        self._write_gpx(
+            output_path, (data[offsets[i] : offsets[i + 1]] for i in self._indices())
+        )
+
         print(f"✓ Merged GPX file created: {output_path}")
-        print(f"  Total track points merged: {len(self.track_points)}")
+        print(f"  Total track points merged: {len(self._indices())}")
 
-    @staticmethod
-    def _clone_element(elem) -> ET.Element:
-        """Create a deep copy of an XML element."""
-        clone = ET.Element(elem.tag, elem.attrib)
-        clone.text = elem.text
-        clone.tail = elem.tail
-        for child in elem:
-            clone.append(GPXMerger._clone_element(child))
-        return clone
+    def merge_files_streaming(
+        self, file_paths: List[str], output_path: str, dedup: bool = False
+    ) -> int:
+        """
+        Merge GPX files whose track points are already in chronological order.
+
+        The files are read side by side and combined with a k-way heap
+        merge while the output is written, so only one point per file is
+        held in memory instead of every point. Waypoints are collected and
+        merged in as well. Points are not added to this merger.
+
+        Args:
+            file_paths: Paths to the GPX files
+            output_path: Path where the merged GPX file will be saved
+            dedup: Drop points whose timestamp, latitude and longitude all
+                match an earlier point
+
+        Returns:
+            The number of duplicate points dropped
+
+        Raises:
+            FileNotFoundError: If a file doesn't exist
+            ET.ParseError: If a file is not valid XML
+            ValueError: If a file's track points are not in chronological order
+        """
+        metadatas = [{} for _ in file_paths]
+        waypoints = []
+        streams = []
+        for file_path, metadata in zip(file_paths, metadatas):
+            namespaces = {}
+            file_waypoints = []
+            stream = self._stream_gpx_file(
+                file_path, metadata, namespaces, file_waypoints
+            )
+            # Reads the file up to its first track point, which covers its
+            # metadata, root namespaces and waypoints
+            first = next(stream, None)
+            if first is not None:
+                stream = chain([first], stream)
+
+            conflicts = self._merge_namespaces(namespaces)
+            if conflicts:
+                file_waypoints = self._declare_in_stream(file_waypoints, conflicts)
+                stream = self._declare_in_stream(stream, conflicts)
+            waypoints.extend(file_waypoints)
+            if first is not None:
+                streams.append(stream)
+
+        if not streams and not waypoints:
+            print("Error: No track points found to merge.", file=sys.stderr)
+            return 0
+
+        # Metadata comes from the first file that has any
+        if not self.metadata:
+            self.metadata.update(next(filter(None, metadatas), {}))
+
+        waypoints.sort(key=itemgetter(0))
+
+        merged = heapq.merge(waypoints, *streams, key=itemgetter(0))
+        read = written = 0
+
+        def count_read(points):
+            nonlocal read
+            for item in points:
+                read += 1
+                yield item
+
+        def output_points(points):
+            nonlocal written
+            for _, point in points:
+                written += 1
+                yield point
+
+        if dedup:
+            merged = self._unique_points(count_read(merged))
+        points = output_points(merged)
+
+        # Write to a temporary file so a failure part-way leaves no output
+        partial_path = output_path + ".part"
+        try:
+            self._write_gpx(partial_path, points)
+            os.replace(partial_path, output_path)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+        print(f"✓ Merged GPX file created: {output_path}")
+        print(f"  Total track points merged: {written}")
+        return read - written if dedup else 0
+
+    @classmethod
+    def _declare_in_stream(cls, points, namespaces: dict):
+        """Declare `namespaces` on every point of (sort key, XML) pairs."""
+        for key, point in points:
+            yield key, cls._add_declarations(point, namespaces)
+
+    def _write_gpx(self, output_path: str, points) -> None:
+        """Write a GPX document with a single track segment holding `points`."""
+        name = self.metadata.get("name", "Merged GPX Track") or ""
+        desc = self.metadata.get("desc", "Merged from multiple GPX files") or ""
+        header = self._HEADER_TEMPLATE.format(
+            namespaces="".join(
+                f" xmlns:{prefix}={quoteattr(uri)}"
+                for prefix, uri in self._namespaces.items()
+            ),
+            name=escape(name),
+            desc=escape(desc),
+            time=datetime.utcnow().isoformat() + "Z",
+        )
+
+        # Stream the fixed document shell and the serialized points straight
+        # to disk instead of building an output tree
+        with open(output_path, "wb", buffering=1 << 20) as f:
+            f.write(header.encode("utf-8"))
+            f.writelines(points)
+            f.write(self._FOOTER)
+
+
+def _make_parse_error(message: str, code: int, line: int, column: int):
+    """Create an ET.ParseError carrying its error code and position."""
+    error = ET.ParseError(message, code, line, column)
+    if not HAVE_LXML:
+        # The stdlib only sets these on errors raised by its own parser
+        error.code = code
+        error.position = (line, column)
+    return error
+
+
+def _read_gpx_file_in_worker(file_path: str, use_expat: bool = False):
+    """
+    Parse a GPX file in a worker process of GPXMerger.parse_gpx_files.
+
+    lxml's ParseError cannot be pickled, so a parse error is returned as
+    the arguments of _make_parse_error for the parent process to raise.
+    """
+    try:
+        return GPXMerger._read_gpx_file(file_path, use_expat), None
+    except ET.ParseError as e:
+        return None, (e.msg, e.code, *e.position)
+
+
+def _has_wildcard(pattern: str) -> bool:
+    """Check whether a path contains glob wildcard characters."""
+    return "*" in pattern or "?" in pattern or "[" in pattern
+
+
+def _expand_input_files(patterns: List[str]) -> List[str]:
+    """
+    Expand command-line file arguments into a list of existing files.
+
+    Literal paths are checked directly. Patterns that only have wildcards
+    in the file name are matched against a directory listing that is read
+    once per directory; other patterns fall back to a recursive glob.
+    Each file is listed once, under the first spelling of its path and in
+    the order its pattern was given.
+    """
+    listings = {}
+    # Real path of each file -> the path as first given
+    files = {}
+    for pattern in patterns:
+        if not _has_wildcard(pattern):
+            if os.path.isfile(pattern):
+                files.setdefault(os.path.realpath(pattern), pattern)
+            continue
+
+        directory, name = os.path.split(pattern)
+        if _has_wildcard(directory) or name == "**":
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            names = listings.get(directory)
+            if names is None:
+                try:
+                    names = sorted(os.listdir(directory or "."))
+                except OSError:
+                    names = []
+                listings[directory] = names
+            matches = [os.path.join(directory, n) for n in fnmatch.filter(names, name)]
+
+        found = [path for path in matches if os.path.isfile(path)]
+        if not found and os.path.isfile(pattern):
+            # A literal file name that happens to contain wildcard characters
+            found = [pattern]
+        for path in found:
+            files.setdefault(os.path.realpath(path), path)
+
+    return list(files.values())
 
 
 def main():
@@ -184,19 +1076,28 @@ Examples:
     parser.add_argument(
         "-o", "--output", default="merged.gpx", help="Output GPX file (default: merged.gpx)"
     )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Drop points with the same timestamp, latitude and longitude",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Merge while reading instead of loading all points into memory; "
+        "the track points of each file must already be in chronological order",
+    )
+    parser.add_argument(
+        "--expat",
+        action="store_true",
+        help="Read files with a faster expat-based reader that copies each "
+        "point's XML from the file (not used with --stream)",
+    )
 
     args = parser.parse_args()
 
     # Expand file paths
-    input_files = []
-    for pattern in args.input_files:
-        matches = list(Path(".").glob(pattern))
-        if matches:
-            input_files.extend([str(f) for f in matches if f.is_file()])
-        else:
-            # Try as direct path
-            if Path(pattern).is_file():
-                input_files.append(pattern)
+    input_files = _expand_input_files(args.input_files)
 
     if not input_files:
         print("Error: No valid GPX files found.", file=sys.stderr)
@@ -206,19 +1107,33 @@ Examples:
     for f in input_files:
         print(f"  - {f}")
 
-    merger = GPXMerger()
+    merger = GPXMerger(use_expat=args.expat)
 
-    # Parse all GPX files
-    for gpx_file in input_files:
+    if args.stream:
+        print(f"Merging {len(input_files)} file(s) while reading...")
         try:
-            print(f"Processing: {gpx_file}")
-            merger.parse_gpx_file(gpx_file)
-        except (FileNotFoundError, ET.ParseError) as e:
+            removed = merger.merge_files_streaming(
+                input_files, args.output, dedup=args.dedup
+            )
+        except (FileNotFoundError, ET.ParseError, ValueError) as e:
             print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
+        if args.dedup:
+            print(f"Removed {removed} duplicate point(s)")
+        return
+
+    # Parse all GPX files, in parallel worker processes
+    print(f"Processing {len(input_files)} file(s)...")
+    try:
+        merger.parse_gpx_files(input_files)
+    except (FileNotFoundError, ET.ParseError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
     # Sort track points chronologically
-    merger.sort_by_timestamp()
+    removed = merger.sort_by_timestamp(dedup=args.dedup)
+    if args.dedup:
+        print(f"Removed {removed} duplicate point(s)")
 
     # Write merged file
     merger.merge_to_file(args.output)
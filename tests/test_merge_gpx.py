@@ -0,0 +1,570 @@
+"""Tests for merge_gpx; run with `python -m unittest discover tests`."""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+import unittest
+import xml.etree.ElementTree as StdET
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import merge_gpx
+from merge_gpx import ET, HAVE_LXML, GPXMerger, _expand_input_files, main
+
+GPX = GPXMerger.GPX_NAMESPACE
+
+
+def gpx_document(points: str, root_attrs: str = f'xmlns="{GPX}"') -> str:
+    """A GPX document with `points` inside a single track segment."""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f"<gpx {root_attrs}><trk><trkseg>\n{points}\n</trkseg></trk></gpx>\n"
+    )
+
+
+class GPXTestCase(unittest.TestCase):
+    """Base class that writes GPX files to a temporary directory."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self._tmp.name, name)
+
+    def write(self, name: str, content, encoding: str = "utf-8") -> str:
+        path = self.path(name)
+        if isinstance(content, str):
+            content = content.encode(encoding)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def merged_points(self, output_path: str):
+        """(time, lat, lon) of every point in a merged file."""
+        root = StdET.parse(output_path).getroot()
+        return [
+            (p.find(f"{{{GPX}}}time").text, p.get("lat"), p.get("lon"))
+            for p in root.iter(f"{{{GPX}}}trkpt")
+        ]
+
+
+class DedupTest(GPXTestCase):
+    def merge(self, *paths, use_expat=False):
+        merger = GPXMerger(use_expat=use_expat)
+        for path in paths:
+            merger.parse_gpx_file(path)
+        removed = merger.sort_by_timestamp(dedup=True)
+        output = self.path("out.gpx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            merger.merge_to_file(output)
+        return removed, self.merged_points(output)
+
+    def test_single_quoted_positions_are_compared(self):
+        path = self.write(
+            "quotes.gpx",
+            gpx_document(
+                "<trkpt lat='11.0' lon='21.0'><time>2025-01-01T00:00:10Z</time></trkpt>\n"
+                "<trkpt lat='12.0' lon='22.0'><time>2025-01-01T00:00:10Z</time></trkpt>\n"
+                '<trkpt lat="11.00" lon="21.0"><time>2025-01-01T00:00:10Z</time></trkpt>'
+            ),
+        )
+        for use_expat in (False, True):
+            with self.subTest(use_expat=use_expat):
+                removed, points = self.merge(path, use_expat=use_expat)
+                self.assertEqual(removed, 1)
+                self.assertEqual(
+                    [(float(lat), float(lon)) for _, lat, lon in points],
+                    [(11.0, 21.0), (12.0, 22.0)],
+                )
+
+    def test_points_without_position_are_kept(self):
+        path = self.write(
+            "nopos.gpx",
+            gpx_document(
+                '<trkpt lat="1.0" lon="2.0"><time>2025-01-01T00:00:00Z</time></trkpt>\n'
+                "<trkpt><time>2025-01-01T00:00:00Z</time></trkpt>\n"
+                "<trkpt><time>2025-01-01T00:00:00Z</time></trkpt>"
+            ),
+        )
+        removed, points = self.merge(path)
+        self.assertEqual(removed, 0)
+        self.assertEqual(len(points), 3)
+
+    def test_duplicate_file_is_dropped(self):
+        content = gpx_document(
+            '<trkpt lat="1.0" lon="2.0"><time>2025-01-01T00:00:00Z</time></trkpt>\n'
+            '<trkpt lat="1.5" lon="2.5"><time>2025-01-01T00:00:01Z</time></trkpt>'
+        )
+        first = self.write("first.gpx", content)
+        second = self.write("second.gpx", content)
+        removed, points = self.merge(first, second)
+        self.assertEqual(removed, 2)
+        self.assertEqual(
+            points,
+            [
+                ("2025-01-01T00:00:00Z", "1.0", "2.0"),
+                ("2025-01-01T00:00:01Z", "1.5", "2.5"),
+            ],
+        )
+
+
+class TimestampTest(GPXTestCase):
+    def keys(self, *times):
+        """Sort keys of a file with one point per time text."""
+        path = self.write(
+            "times.gpx",
+            gpx_document(
+                "\n".join(
+                    f'<trkpt lat="{i}" lon="{i}"><time>{text}</time></trkpt>'
+                    for i, text in enumerate(times)
+                )
+            ),
+        )
+        _, _, keys, _ = GPXMerger._read_gpx_file(path)
+        return list(keys)
+
+    def test_offsets_and_naive_times_are_utc_instants(self):
+        keys = self.keys(
+            "2025-01-01T10:00:00Z", "2025-01-01T11:00:00+01:00", "2025-01-01T10:00:00"
+        )
+        instant = datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
+        expected = int(instant.timestamp()) * 10**6
+        self.assertEqual(keys, [expected] * 3)
+
+    def test_fractional_seconds_of_mixed_precision(self):
+        keys = self.keys(
+            "2025-01-01T00:00:00.250000Z",
+            "2025-01-01T00:00:00.500Z",
+            "2025-01-01T00:00:00Z",
+            "2025-01-01T00:00:00.000001Z",
+        )
+        start = keys[2]
+        self.assertEqual([key - start for key in keys], [250000, 500000, 0, 1])
+
+    def test_invalid_timestamp_is_skipped_with_warning(self):
+        path = self.write(
+            "invalid.gpx",
+            gpx_document(
+                '<trkpt lat="1.0" lon="2.0"><time>2025-01-01T00:00:01Z</time></trkpt>\n'
+                '<trkpt lat="3.0" lon="4.0"><time>yesterday</time></trkpt>\n'
+                '<trkpt lat="5.0" lon="6.0"><time>2025-01-01T00:00:00Z</time></trkpt>'
+            ),
+        )
+        merger = GPXMerger()
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            merger.parse_gpx_file(path)
+        self.assertIn("Could not parse timestamp 'yesterday'", stderr.getvalue())
+
+        merger.sort_by_timestamp()
+        output = self.path("out.gpx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            merger.merge_to_file(output)
+        self.assertEqual(
+            self.merged_points(output),
+            [
+                ("2025-01-01T00:00:00Z", "5.0", "6.0"),
+                ("2025-01-01T00:00:01Z", "1.0", "2.0"),
+            ],
+        )
+
+
+class SortKeyCacheTest(unittest.TestCase):
+    def convert(self, raw_times):
+        """Convert `raw_times`, noting which sort key function was used."""
+        with mock.patch.object(
+            merge_gpx, "_cached_sort_key", wraps=merge_gpx._cached_sort_key
+        ) as cached, mock.patch.object(
+            merge_gpx, "_sort_key", wraps=merge_gpx._sort_key
+        ) as uncached:
+            keys, _ = GPXMerger._convert_timestamps(
+                raw_times, [b""] * len(raw_times), "test.gpx"
+            )
+        return keys, cached.called, uncached.called
+
+    def test_repeated_timestamps_use_cache(self):
+        # Four points per second, as logged by a 4 Hz device
+        raw_times = [
+            f"2025-01-01T00:{i // 240:02}:{i // 4 % 60:02}Z" for i in range(400)
+        ]
+        keys, cached, uncached = self.convert(raw_times)
+        self.assertTrue(cached)
+        self.assertFalse(uncached)
+        self.assertEqual(list(keys), [merge_gpx._sort_key(t) for t in raw_times])
+
+    def test_unique_timestamps_skip_cache(self):
+        raw_times = [f"2025-01-01T00:{i // 60:02}:{i % 60:02}Z" for i in range(400)]
+        keys, cached, uncached = self.convert(raw_times)
+        self.assertFalse(cached)
+        self.assertTrue(uncached)
+        self.assertEqual(
+            list(keys), [merge_gpx._cached_sort_key(t) for t in raw_times]
+        )
+
+
+class StreamTest(GPXTestCase):
+    def track(self, name: str, count: int, start: int = 0, step: int = 1) -> str:
+        """A file with `count` track points, `step` seconds apart."""
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        points = "\n".join(
+            f'<trkpt lat="{i}" lon="{i}"><time>'
+            f"{(base + timedelta(seconds=start + i * step)).isoformat()}"
+            "</time></trkpt>"
+            for i in range(count)
+        )
+        return self.write(name, gpx_document(points))
+
+    def stream(self, *paths):
+        output = self.path("stream.gpx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            GPXMerger().merge_files_streaming(list(paths), output)
+        return output
+
+    def test_matches_in_memory_merge(self):
+        paths = [self.track("even.gpx", 50, step=2), self.track("odd.gpx", 50, 1, 2)]
+        merger = GPXMerger()
+        for path in paths:
+            merger.parse_gpx_file(path)
+        merger.sort_by_timestamp()
+        output = self.path("memory.gpx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            merger.merge_to_file(output)
+
+        self.assertEqual(
+            self.merged_points(self.stream(*paths)), self.merged_points(output)
+        )
+
+    def test_unsorted_file_is_rejected_without_output(self):
+        path = self.track("backwards.gpx", 3, start=10, step=-1)
+        with self.assertRaises(ValueError):
+            self.stream(path)
+        self.assertEqual(os.listdir(self._tmp.name), ["backwards.gpx"])
+
+    @unittest.skipIf(HAVE_LXML, "tracemalloc does not see libxml2 allocations")
+    def test_memory_does_not_grow_with_points(self):
+        peaks = []
+        for count in (2000, 20000):
+            path = self.track(f"{count}.gpx", count)
+            tracemalloc.start()
+            try:
+                self.stream(path)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        small, large = peaks
+        self.assertLess(large, small * 1.25)
+
+
+class ParallelParseTest(GPXTestCase):
+    def setUp(self):
+        super().setUp()
+        self.paths = [
+            self.write(
+                f"{n}.gpx",
+                gpx_document(
+                    f'<trkpt lat="{n}" lon="{n}"><time>2025-01-0{n}T00:00:00Z</time></trkpt>'
+                ),
+            )
+            for n in (1, 2, 3)
+        ]
+
+    def test_small_inputs_are_parsed_in_process(self):
+        merger = GPXMerger()
+        with mock.patch("merge_gpx.ProcessPoolExecutor") as executor:
+            merger.parse_gpx_files(self.paths, max_workers=4)
+        executor.assert_not_called()
+        self.assertEqual(len(merger.track_points), 3)
+
+    def test_workers_keep_file_order_and_raise_parse_errors(self):
+        with mock.patch.object(GPXMerger, "_PARALLEL_MIN_BYTES", 0):
+            merger = GPXMerger()
+            merger.parse_gpx_files(self.paths, max_workers=2)
+            self.assertEqual([src for _, _, src in merger.track_points], self.paths)
+
+            bad = self.write("bad.gpx", f'<gpx xmlns="{GPX}"><trk>')
+            with self.assertRaises(ET.ParseError) as raised:
+                GPXMerger().parse_gpx_files([bad] + self.paths, max_workers=2)
+        self.assertIn("bad.gpx", str(raised.exception))
+        self.assertEqual(raised.exception.position[0], 1)
+
+
+class ExpandInputFilesTest(GPXTestCase):
+    def test_same_file_is_listed_once_under_first_spelling(self):
+        a = self.write("a.gpx", gpx_document(""))
+        b = self.write("b.gpx", gpx_document(""))
+        dotted = os.path.join(self._tmp.name, ".", "a.gpx")
+        patterns = [dotted, a, self.path("*.gpx"), os.path.join(self._tmp.name, "?.gpx")]
+        self.assertEqual(_expand_input_files(patterns), [dotted, b])
+
+
+class ExpatReaderTest(GPXTestCase):
+    POINT = '<trkpt lat="1.0" lon="2.0"><time>2025-01-01T00:00:00Z</time></trkpt>'
+
+    def read(self, path: str):
+        """Read a file with both readers and check that they agree."""
+        parsed = GPXMerger._read_gpx_file(path, use_expat=True)
+        expected = GPXMerger._read_gpx_file(path)
+        self.assertEqual(parsed[:3], expected[:3])
+        return parsed
+
+    def merge(self, path: str):
+        """Merge a file with the expat reader and parse the output."""
+        merger = GPXMerger(use_expat=True)
+        merger.parse_gpx_file(path)
+        output = self.path("out.gpx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            merger.merge_to_file(output)
+        return StdET.parse(output).getroot()
+
+    def test_prefixed_gpx_elements(self):
+        path = self.write(
+            "prefixed.gpx",
+            f'<g:gpx xmlns:g="{GPX}"><g:metadata><g:name>A &amp; B</g:name>'
+            "</g:metadata><g:trk><g:trkseg>"
+            '<g:trkpt lat="1.0" lon="2.0"><g:time>2025-01-01T00:00:00Z</g:time>'
+            "<plain/></g:trkpt></g:trkseg></g:trk></g:gpx>",
+        )
+        metadata, _, _, points = self.read(path)
+        self.assertEqual(metadata, {"name": "A & B"})
+        self.assertTrue(points[0].startswith(b'<g:trkpt xmlns="" lat='))
+
+        point = self.merge(path).find(f".//{{{GPX}}}trkpt")
+        self.assertEqual(point.find(f"{{{GPX}}}time").text, "2025-01-01T00:00:00Z")
+        # Unprefixed children stay outside the GPX namespace
+        self.assertIsNotNone(point.find("plain"))
+
+    def test_root_prefixes_are_declared_on_output_root(self):
+        path = self.write(
+            "extension.gpx",
+            gpx_document(
+                '<trkpt lat="1.0" lon="2.0"><time>2025-01-01T00:00:00Z</time>'
+                "<extensions><x:hr>120</x:hr></extensions></trkpt>",
+                f'xmlns="{GPX}" xmlns:x="urn:x" xmlns:unused="urn:unused"',
+            ),
+        )
+        _, namespaces, _, points = self.read(path)
+        self.assertEqual(namespaces, {"x": "urn:x", "unused": "urn:unused"})
+        self.assertTrue(points[0].startswith(b'<trkpt lat='))
+        self.assertNotIn(b"xmlns", points[0])
+
+        point = self.merge(path).find(f".//{{{GPX}}}trkpt")
+        self.assertEqual(point.find(f".//{{urn:x}}hr").text, "120")
+
+    def test_own_default_namespace_is_not_repeated(self):
+        path = self.write(
+            "own.gpx",
+            f'<g:gpx xmlns:g="{GPX}"><g:trk><g:trkseg>'
+            f'<trkpt xmlns="{GPX}" lat="1.0" lon="2.0">'
+            "<time>2025-01-01T00:00:00Z</time></trkpt>"
+            "</g:trkseg></g:trk></g:gpx>",
+        )
+        _, _, _, points = self.read(path)
+        self.assertEqual(points[0].count(b"xmlns"), 1)
+        self.assertEqual(len(self.merge(path).findall(f".//{{{GPX}}}trkpt")), 1)
+
+    def test_cdata_time(self):
+        path = self.write(
+            "cdata.gpx",
+            gpx_document(
+                '<trkpt lat="1.0" lon="2.0">'
+                "<time><![CDATA[2025-01-01T00:00:00Z]]></time></trkpt>"
+            ),
+        )
+        _, _, keys, _ = self.read(path)
+        self.assertEqual(len(keys), 1)
+
+    def test_byte_order_mark(self):
+        path = self.write("bom.gpx", b"\xef\xbb\xbf" + gpx_document(self.POINT).encode())
+        _, _, _, points = self.read(path)
+        self.assertEqual(points, [self.POINT.encode() + b"\n"])
+
+    def test_non_utf8_file_falls_back(self):
+        path = self.write(
+            "latin1.gpx",
+            gpx_document(
+                '<trkpt lat="1.0" lon="2.0"><time>2025-01-01T00:00:00Z</time>'
+                "<name>Zürich</name></trkpt>"
+            ).replace("UTF-8", "ISO-8859-1"),
+            encoding="latin-1",
+        )
+        self.assertIsNone(GPXMerger._read_gpx_file_expat(path))
+        _, _, _, points = self.read(path)
+        self.assertIn("Zürich".encode("utf-8"), points[0])
+
+    def test_dtd_falls_back(self):
+        path = self.write(
+            "dtd.gpx",
+            '<?xml version="1.0"?><!DOCTYPE gpx [<!ENTITY place "Oslo">]>'
+            + gpx_document(
+                '<trkpt lat="1.0" lon="2.0"><time>2025-01-01T00:00:00Z</time>'
+                "<name>&place;</name></trkpt>"
+            ).split("\n", 1)[1],
+        )
+        self.assertIsNone(GPXMerger._read_gpx_file_expat(path))
+        _, _, _, points = self.read(path)
+        self.assertIn(b"<name>Oslo</name>", points[0])
+
+    def test_invalid_xml(self):
+        path = self.write("bad.gpx", f'<gpx xmlns="{GPX}"><trk>\n<trkseg></trk></gpx>')
+        with self.assertRaises(ET.ParseError) as raised:
+            GPXMerger._read_gpx_file_expat(path)
+        self.assertEqual(raised.exception.position, (2, 10))
+
+    def test_command_line_expat_dedup(self):
+        first = self.write(
+            "first.gpx",
+            gpx_document(
+                "<trkpt lat='1.0' lon='2.0'><time>2025-01-01T00:00:00Z</time></trkpt>"
+            ),
+        )
+        second = self.write(
+            "second.gpx",
+            gpx_document(
+                '<trkpt lat="1.00" lon="2.0"><time>2025-01-01T00:00:00Z</time></trkpt>\n'
+                '<trkpt lat="3.0" lon="4.0"><time>2025-01-01T00:00:00Z</time></trkpt>'
+            ),
+        )
+        output = self.path("out.gpx")
+        argv = ["merge_gpx.py", first, second, "-o", output, "--expat", "--dedup"]
+        with mock.patch.object(sys, "argv", argv):
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                main()
+        self.assertIn("Removed 1 duplicate point(s)", stdout.getvalue())
+        self.assertEqual(
+            self.merged_points(output),
+            [
+                ("2025-01-01T00:00:00Z", "1.0", "2.0"),
+                ("2025-01-01T00:00:00Z", "3.0", "4.0"),
+            ],
+        )
+
+
+class SerializePointTest(GPXTestCase):
+    def assertSameElement(self, actual, expected):
+        for field in ("tag", "attrib", "text", "tail"):
+            self.assertEqual(
+                getattr(actual, field) or "", getattr(expected, field) or "", field
+            )
+        self.assertEqual(len(actual), len(expected))
+        for actual_child, expected_child in zip(actual, expected):
+            self.assertSameElement(actual_child, expected_child)
+
+    def test_points_round_trip(self):
+        point = (
+            '<trkpt lat="1.0" lon="2.0" x:a="q&quot;&lt;&#10;" xml:lang="en">'
+            "<time>2025-01-01T00:00:00Z</time><desc>a &amp; b &gt; c</desc>"
+            '<extensions><x:e x:b="1">text<x:f/>tail</x:e>'
+            '<plain xmlns=""><inner/></plain><y:g xmlns:y="urn:y"/></extensions>'
+            "</trkpt>"
+        )
+        path = self.write(
+            "point.gpx", gpx_document(point, f'xmlns="{GPX}" xmlns:x="urn:x"')
+        )
+        _, namespaces, _, points = GPXMerger._read_gpx_file(path)
+
+        expected = StdET.parse(path).getroot().find(f".//{{{GPX}}}trkpt")
+        expected.tail = None
+        output = StdET.fromstring(
+            f'<gpx xmlns="{GPX}" xmlns:x="{namespaces["x"]}">'.encode()
+            + points[0].rstrip()
+            + b"</gpx>"
+        )
+        self.assertSameElement(output[0], expected)
+
+
+class RootNamespaceTest(GPXTestCase):
+    GARMIN = (
+        f'xmlns="{GPX}" xmlns:ns3="urn:tpx" xmlns:ns2="urn:gpxx" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+    )
+
+    def extension_file(self, name: str, root_attrs: str, second: int) -> str:
+        prefix = "ns3" if "ns3" in root_attrs else "x"
+        return self.write(
+            name,
+            gpx_document(
+                f'<trkpt lat="{second}" lon="{second}">'
+                f"<time>2025-01-01T00:00:0{second}Z</time><extensions>"
+                f"<{prefix}:hr>12{second}</{prefix}:hr></extensions></trkpt>",
+                root_attrs,
+            ),
+        )
+
+    def outputs(self, *paths):
+        """Merge `paths` in memory, with the expat reader and by streaming."""
+        for mode in ("memory", "expat", "stream"):
+            output = self.path(f"{mode}.gpx")
+            with contextlib.redirect_stdout(io.StringIO()):
+                if mode == "stream":
+                    GPXMerger().merge_files_streaming(list(paths), output)
+                else:
+                    merger = GPXMerger(use_expat=mode == "expat")
+                    for path in paths:
+                        merger.parse_gpx_file(path)
+                    merger.sort_by_timestamp()
+                    merger.merge_to_file(output)
+            with open(output, encoding="utf-8") as f:
+                yield mode, f.read(), StdET.parse(output).getroot()
+
+    def test_declared_once_on_output_root(self):
+        paths = [
+            self.extension_file("a.gpx", self.GARMIN, 1),
+            self.extension_file("b.gpx", self.GARMIN, 2),
+        ]
+        for mode, text, root in self.outputs(*paths):
+            with self.subTest(mode=mode):
+                self.assertEqual(text.count("xmlns:ns3="), 1)
+                self.assertIn('xmlns:ns3="urn:tpx"', text.split("\n", 2)[1])
+                self.assertNotIn("xmlns", text[text.index("<trkpt") :])
+                self.assertEqual(
+                    [hr.text for hr in root.iter("{urn:tpx}hr")], ["121", "122"]
+                )
+
+    def test_conflicting_prefixes_stay_on_points(self):
+        paths = [
+            self.extension_file("a.gpx", f'xmlns="{GPX}" xmlns:x="urn:a"', 1),
+            self.extension_file("b.gpx", f'xmlns="{GPX}" xmlns:x="urn:b"', 2),
+        ]
+        for mode, text, root in self.outputs(*paths):
+            with self.subTest(mode=mode):
+                self.assertEqual(text.count('xmlns:x="urn:b"'), 1)
+                self.assertEqual(root.find(".//{urn:a}hr").text, "121")
+                self.assertEqual(root.find(".//{urn:b}hr").text, "122")
+
+
+@unittest.skipIf(HAVE_LXML, "lxml has no global namespace registry")
+class NamespaceRegistryTest(GPXTestCase):
+    def setUp(self):
+        super().setUp()
+        saved = dict(StdET._namespace_map)
+        self.addCleanup(StdET._namespace_map.update, saved)
+        self.addCleanup(StdET._namespace_map.clear)
+        StdET._namespace_map.pop(GPX, None)
+
+    def test_leaves_namespace_registry_alone(self):
+        registry = dict(StdET._namespace_map)
+        path = self.write("a.gpx", gpx_document(ExpatReaderTest.POINT))
+        _, _, _, points = GPXMerger._read_gpx_file(path)
+        self.assertEqual(StdET._namespace_map, registry)
+        self.assertTrue(points[0].startswith(b"<trkpt lat="))
+
+    def test_keeps_prefix_registered_by_host_program(self):
+        StdET.register_namespace("host", GPX)
+        path = self.write("a.gpx", gpx_document(ExpatReaderTest.POINT))
+        merger = GPXMerger()
+        merger.parse_gpx_file(path)
+        self.assertEqual(StdET._namespace_map[GPX], "host")
+
+        output = self.path("out.gpx")
+        with contextlib.redirect_stdout(io.StringIO()):
+            merger.merge_to_file(output)
+        self.assertEqual(
+            self.merged_points(output), [("2025-01-01T00:00:00Z", "1.0", "2.0")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()